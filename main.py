@@ -5,22 +5,207 @@ from pylibdmtx import pylibdmtx
 import numpy as np
 import time
 import sys
-from queue import Empty
+import os
+import re
+import glob
+import struct
+import collections
 from typing import Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    from numba import njit
+except ImportError:  # без numba фильтр работает как обычная Python-функция
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# потоки OpenCV не должны отнимать ядра у потоков декодирования
+cv2.setNumThreads(2)
 
 
 # ---------- поиск камер ----------
-def list_cameras(max_devices: int = 4):
+VIDIOC_QUERYCAP = 0x80685600  # _IOR('V', 0, struct v4l2_capability)
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+
+def list_v4l2_cameras():
+    """Камеры V4L2 по /dev/video*, без открытия захвата; None — если не удалось"""
+    try:
+        import fcntl
+    except ImportError:
+        return None
+
     available = []
-    for i in range(max_devices):
-        cap = cv2.VideoCapture(i)
+    for path in glob.glob("/dev/video*"):
+        m = re.fullmatch(r"/dev/video(\d+)", path)
+        if not m:
+            continue
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            continue
+        try:
+            caps = bytearray(104)  # sizeof(struct v4l2_capability)
+            fcntl.ioctl(fd, VIDIOC_QUERYCAP, caps)
+        except OSError:
+            continue
+        finally:
+            os.close(fd)
+
+        # у UVC-камер рядом есть узлы метаданных — их отсекаем по device_caps
+        capabilities, device_caps = struct.unpack_from("<II", caps, 84)
+        if capabilities & V4L2_CAP_DEVICE_CAPS:
+            capabilities = device_caps
+        if capabilities & V4L2_CAP_VIDEO_CAPTURE:
+            available.append(int(m.group(1)))
+    return sorted(available)
+
+
+def list_dshow_cameras():
+    """Камеры DirectShow через pygrabber; None — если pygrabber не установлен"""
+    try:
+        from pygrabber.dshow_graph import FilterGraph
+    except ImportError:
+        return None
+    try:
+        return list(range(len(FilterGraph().get_input_devices())))
+    except Exception:
+        return None
+
+
+def open_camera(index: int) -> cv2.VideoCapture:
+    """Открыть камеру тем же бэкендом, которым list_cameras её нашёл"""
+    # Linux: V4L2 напрямую — через другие бэкенды BUFFERSIZE не работает.
+    # Windows: DirectShow — индексы pygrabber идут в его порядке, а у MSMF
+    # (бэкенд по умолчанию) нумерация устройств другая
+    backend = None
+    if sys.platform.startswith("linux"):
+        backend = cv2.CAP_V4L2
+    elif sys.platform == "win32":
+        backend = cv2.CAP_DSHOW
+
+    if backend is not None:
+        cap = cv2.VideoCapture(index, backend)
         if cap.isOpened():
-            available.append(i)
-            cap.release()
+            return cap
+        cap.release()
+    return cv2.VideoCapture(index)
+
+
+def probe_camera(index: int) -> bool:
+    cap = open_camera(index)
+    try:
+        return cap.isOpened()
+    finally:
+        cap.release()
+
+
+def probe_cameras(max_devices: int = 4, timeout: float = 1.5):
+    # открытие несуществующей камеры может висеть секундами — пробуем все сразу.
+    # Потоки daemon: потоки ThreadPoolExecutor join'ятся при выходе, и
+    # зависшая попытка задержала бы закрытие приложения
+    import threading
+    found = []
+    lock = threading.Lock()
+
+    def probe(index):
+        try:
+            ok = probe_camera(index)
+        except Exception:
+            return
+        if ok:
+            with lock:
+                found.append(index)
+
+    threads = [
+        threading.Thread(target=probe, args=(i,), daemon=True)
+        for i in range(max_devices)
+    ]
+    for t in threads:
+        t.start()
+    # общий срок на все попытки; зависшие не ждём
+    deadline = time.monotonic() + timeout
+    for t in threads:
+        t.join(max(deadline - time.monotonic(), 0))
+
+    with lock:
+        return sorted(found)
+
+
+def list_cameras(max_devices: int = 4):
+    # перечисление устройств быстрее, чем открывать каждое через VideoCapture
+    available = None
+    if sys.platform.startswith("linux"):
+        available = list_v4l2_cameras()
+    elif sys.platform == "win32":
+        available = list_dshow_cameras()
+
+    if available is None:
+        available = probe_cameras(max_devices)
     return available
 
 
+# ---------- фильтр компонент ----------
+# отношение длинной стороны к короткой: квадратные символы (с запасом
+# на поворот и перспективу) и прямоугольные 8x18 … 16x48
+SQUARE_ASPECT = (1.0, 1.4)
+RECT_ASPECT = (1.8, 4.2)
+# доля тёмных пикселей в рамке компоненты. Сплошными модули выходят, только
+# пока они заметно меньше блока adaptiveThreshold (25 px), иначе от них
+# остаются контуры и доля падает до ~0.15. Поэтому проверяем её лишь у
+# компонент не длиннее FILL_MAX_SIDE (модуль 10x10-символа <= 10 px);
+# у таких повёрнутый код даёт >= ~0.2, ровный — ~0.5
+MIN_FILL = 0.15
+FILL_MAX_SIDE = 100
+
+
+def roi_aspects(dm_shape):
+    """Допустимые диапазоны пропорций ROI для заданного размера символа libdmtx"""
+    sizes = pylibdmtx.DmtxSymbolSize
+    if dm_shape is None or dm_shape == sizes.DmtxSymbolShapeAuto:
+        ranges = [SQUARE_ASPECT, RECT_ASPECT]
+    elif dm_shape == sizes.DmtxSymbolRectAuto or dm_shape >= sizes.DmtxSymbol8x18:
+        ranges = [RECT_ASPECT]
+    else:
+        ranges = [SQUARE_ASPECT]
+    return np.array(ranges, np.float64)
+
+
+@njit(cache=True, fastmath=True)
+def filter_stats(stats, w, h, min_area, min_side, aspects, min_fill, fill_max_side, out):
+    """Отобрать компоненты, похожие на код; пишет (x, y, w, h) в out, возвращает их число"""
+    n = 0
+    # stats[0] — фон
+    for i in range(1, stats.shape[0]):
+        x, y, cw, ch, area = stats[i, 0], stats[i, 1], stats[i, 2], stats[i, 3], stats[i, 4]
+        if area < min_area:
+            continue
+        if cw < min_side or ch < min_side:
+            continue
+        if cw > w * 0.9 or ch > h * 0.9:
+            continue
+        # заведомо не DataMatrix: libdmtx потратил бы на них весь timeout
+        if max(cw, ch) <= fill_max_side and area < min_fill * cw * ch:
+            continue
+        ar = max(cw, ch) / min(cw, ch)
+        ok = False
+        for j in range(aspects.shape[0]):
+            if aspects[j, 0] <= ar <= aspects[j, 1]:
+                ok = True
+                break
+        if not ok:
+            continue
+
+        out[n, 0] = x
+        out[n, 1] = y
+        out[n, 2] = cw
+        out[n, 3] = ch
+        n += 1
+    return n
+
+
 # ---------- основное приложение ----------
 class DataMatrixScanner:
     def __init__(self, root: tk.Tk):
@@ -38,39 +223,106 @@ class DataMatrixScanner:
 
         self.cap: Optional[cv2.VideoCapture] = None
         self.running = False
-        # shared frame (thread-safe)
-        self.latest_frame = None
-        self.frame_lock = None
+        # shared frame: два буфера — loop() читает front, retrieve() пишет
+        # в другой; публикация — одно присваивание кортежа, lock не нужен
+        self.frame_bufs = [None, None]
+        self.front = 0  # меняет только grab_loop
+        self.front_frame = (0, None)  # (номер кадра, буфер) для loop()
+        self.frame_seq = 0  # номер последнего опубликованного кадра
+        self.shown_seq = 0  # номер последнего обработанного кадра
+        # поток захвата будит loop() этим событием, а не after(1) по кругу
+        self.FRAME_EVENT = "<<NewFrame>>"
+        # при занятом worker'е декодируем (retrieve) только каждый N-й кадр
+        self.RENDER_EVERY = 2
 
         # параметры логирования
         self.logged_params = False
+        # телеметрия: раз в STATS_INTERVAL секунд — FPS, слоты, время декода
+        self.STATS_INTERVAL = 2.0
+        self.stats_t0 = None
+        self.stats_frames = 0
+        self.decode_times = collections.deque(maxlen=64)  # секунды на проход worker'а
+        # сглаженное время прохода worker'а; по нему loop() решает, когда отдать кадр
+        self.decode_ema = 0.0
+        self.last_submit = 0.0
 
         # учёт кодов
         self.seen_codes = set()
         self.code_counter = 0
         self.scanned_codes = []  # Список всех отсканированных кодов
+        self.rendered_count = 0  # сколько из них уже выведено в codes_text
+        self.codes_dirty = False  # перерисовка уже запланирована через after_idle
         self.scan_start_time = None
         self.time_for_10_codes = None
 
         # трекинг рамок
-        self.tracked = {}  # code -> {polygon, last_seen}
+        # параллельные массивы: код, время последнего появления, рамка (4 точки)
+        self.track_codes = []
+        self.track_index = {}  # code -> индекс в массивах
+        self.track_last_seen = np.empty(0, np.float64)
+        self.track_polys = np.empty((0, 4, 2), np.int32)
         self.TRACK_TIMEOUT = 0.5
 
-        # ROI-трекинг
-        self.active_roi = None
-        self.roi_last_seen = 0
+        # ROI-трекинг: пока код виден, декодируем только его окрестность
+        self.active_rois = []  # [(x, y, w, h, expires)]
         self.ROI_TIMEOUT = 0.3
+        self.ROI_PAD = 20
         self.frame_counter = 0
+
+        # параметры pylibdmtx
+        self.DETECT_WIDTH = 1280  # ROI ищем на кадре примерно такой ширины
+        self.ROI_MAX_COUNT = 1  # в одном ROI — один код
+        self.CANVAS_GAP = 20  # белый зазор между ROI на общем холсте
+        self.CANVAS_TIMEOUT = 15
+        self.DECODE_WORKERS = os.cpu_count() or 1  # потоков pylibdmtx, по холсту на каждый
+        self.FALLBACK_SHRINK = 2  # полный кадр ищем на уменьшенной копии
+        self.FALLBACK_MAX_COUNT = 8
+        self.FALLBACK_EVERY = 10  # полный кадр — раз в N проходов worker'а
+        # на больших кадрах полный кадр делим на перекрывающиеся плитки
+        self.TILE_MIN_WIDTH = 2560
+        self.TILE_GRID = 4  # 4x4 плитки
+        self.TILE_OVERLAP = 0.2  # доля плитки, общая с соседней
+        self.tiles = None  # [(x, y, w, h)] для tiles_shape
+        self.tiles_shape = None
+        self.decode_passes = 0
+        # кадр без движения и без кодов не декодируем (кроме каждого N-го)
+        self.MOTION_THRESHOLD = 8
+        self.IDLE_DECODE_EVERY = 10
+        self.prev_small = None
+        self.idle_skips = 0
+
+        # CUDA для бинаризации при поиске ROI (если есть видеокарта)
+        self.gpu = self.init_gpu()
+        # без CUDA — OpenCL (T-API) на встроенной видеокарте, если есть
+        self.ocl = self.gpu is None and self.init_ocl()
+        # рабочие буферы поиска ROI (пересоздаются при смене размера кадра)
+        self.roi_ws = None
+        self.stats_out = np.empty((0, 4), np.int32)  # выход filter_stats, только растёт
+        self.canvas_bufs = {}  # холсты пакетного декода по номеру группы, только растут
+
         # лёгкий цифровой зум
         self.zoom_factor = 1.08
+        self.zoom_buf = None  # выходной буфер зума, переиспользуется
+        self.zoom_matrix = None  # кроп + масштаб одной аффинной матрицей
+        self.zoom_key = None  # (zoom_factor, shape), для которых посчитана матрица
+        # в окно видео идёт уменьшенная копия шириной не больше DISPLAY_WIDTH
+        self.DISPLAY_WIDTH = 1280
+        self.display_buf = None
+        # BGR -> GRAY сразу с понижением яркости (x0.40) — один проход по кадру
+        self.gray_weights = np.array([[0.114, 0.587, 0.299]], dtype=np.float32) * 0.40
 
         # Настройки камеры
         self.camera_settings = {
             'width': 3840,
             'height': 2160,
             'fps': 60,
-            'fourcc': cv2.VideoWriter.fourcc(*"MJPG")
+            'fourcc': cv2.VideoWriter.fourcc(*"MJPG"),
+            # размер символа для libdmtx, напр. pylibdmtx.DmtxSymbolSize.DmtxSymbol16x16;
+            # None — перебирать все размеры
+            'dm_shape': None,
         }
+        # пропорции ROI под dm_shape — пересчитываются при старте
+        self.roi_aspects = roi_aspects(self.camera_settings['dm_shape'])
 
         # Доступные разрешения
         self.resolutions = [
@@ -81,14 +333,24 @@ class DataMatrixScanner:
             (3840, 2160),
         ]
 
-        # очереди для декодирования
-        import queue
-        self.decode_queue = queue.Queue(maxsize=4)
-        self.result_queue = queue.Queue()
-
-        # потокобезопасный lock для кадров
+        # слоты «последнее значение» для декодирования: append() вытесняет
+        # старое, pop()/popleft() атомарны — Queue с её lock'ами не нужна
+        self.decode_slot = collections.deque(maxlen=1)
+        self.result_slot = collections.deque(maxlen=1)  # только свежие результаты
+        # серые кадры передаются worker'у без копирования: из трёх буферов
+        # один может читать worker, один лежать в слоте, в третий пишем
+        self.gray_bufs = None
+        self.gray_busy = None  # индекс буфера у worker'а
+        self.gray_queued = None  # индекс буфера в слоте
+
+        # синхронизация потоков
         import threading
-        self.frame_lock = threading.Lock()
+        self.frame_wanted = threading.Event()  # loop() закончил с кадром и ждёт следующий
+        self.decode_ready = threading.Event()  # в decode_slot появился кадр
+
+        # потоки декодирования ROI: pylibdmtx вызывает libdmtx через ctypes,
+        # GIL на время вызова отпускается, холсты декодируются параллельно
+        self.decode_pool = ThreadPoolExecutor(max_workers=self.DECODE_WORKERS)
 
         # worker поток
         self.worker_thread = threading.Thread(target=self.decode_worker, daemon=True)
@@ -96,6 +358,7 @@ class DataMatrixScanner:
 
         # UI переменные
         cams = list_cameras()
+        self.cameras = cams
         if not cams:
             messagebox.showerror("Ошибка", "Камеры не найдены")
             root.destroy()
@@ -108,10 +371,13 @@ class DataMatrixScanner:
         self.create_main_window()
         self.create_codes_window()
         self.create_settings_window()
+        self.create_video_window()
 
         # горячая клавиша: C — очистить скан
         self.root.bind("<c>", lambda e: self.reset_scan())
         self.root.bind("<C>", lambda e: self.reset_scan())
+        # новый кадр из grab_loop — обработать его в главном потоке
+        self.root.bind(self.FRAME_EVENT, lambda e: self.loop())
 
     def create_main_window(self):
         """Создание главного окна управления"""
@@ -133,7 +399,7 @@ class DataMatrixScanner:
 
         ttk.Label(camera_frame, text="Выберите камеру:").grid(row=0, column=0, sticky=tk.W, padx=5)
         camera_combo = ttk.Combobox(
-            camera_frame, values=list_cameras(), state="readonly",
+            camera_frame, values=self.cameras, state="readonly",
             textvariable=self.selected_camera, width=15
         )
         camera_combo.grid(row=0, column=1, padx=5)
@@ -307,6 +573,26 @@ class DataMatrixScanner:
         # При закрытии окна - скрываем его
         self.settings_window.protocol("WM_DELETE_WINDOW", self.settings_window.withdraw)
 
+    def create_video_window(self):
+        """Создание окна видео (вместо cv2.imshow)"""
+        self.video_window = tk.Toplevel(self.root)
+        self.video_window.title("DataMatrix Scanner (Q — выход, C — очистка)")
+        self.video_window.withdraw()
+
+        # одна PhotoImage на всё время: кадр заменяет её содержимое на месте
+        self.video_photo = tk.PhotoImage()
+        self.video_label = tk.Label(self.video_window, image=self.video_photo, bd=0)
+        self.video_label.pack(fill=tk.BOTH, expand=True)
+
+        # клавиши обрабатывает само окно — waitKey не нужен
+        for key in ("<q>", "<Q>"):
+            self.video_window.bind(key, lambda e: self.stop())
+        for key in ("<c>", "<C>"):
+            self.video_window.bind(key, lambda e: self.reset_scan())
+
+        # При закрытии окна - останавливаем сканирование
+        self.video_window.protocol("WM_DELETE_WINDOW", self.stop)
+
     def show_codes_window(self):
         """Показать окно с кодами"""
         self.codes_window.deiconify()
@@ -338,19 +624,33 @@ class DataMatrixScanner:
         else:
             messagebox.showinfo("Информация", "Настройки сохранены")
 
+    def schedule_codes_display(self):
+        """Запланировать одну перерисовку списка кодов на простой Tk"""
+        if not self.codes_dirty:
+            self.codes_dirty = True
+            self.root.after_idle(self.update_codes_display)
+
     def update_codes_display(self):
         """Обновить отображение кодов в окне"""
-        self.codes_text.delete(1.0, tk.END)
-        
+        self.codes_dirty = False
+
+        # список только растёт: дописываем новые строки, а целиком
+        # перерисовываем лишь после очистки или поверх заглушки
+        if self.rendered_count == 0 or self.rendered_count > len(self.scanned_codes):
+            self.codes_text.delete(1.0, tk.END)
+            self.rendered_count = 0
+
         if not self.scanned_codes:
             self.codes_text.insert(tk.END, "Нет отсканированных кодов")
             return
-        
-        for i, code in enumerate(self.scanned_codes, 1):
+
+        start = self.rendered_count
+        for i, code in enumerate(self.scanned_codes[start:], start + 1):
             timestamp = code.get('timestamp', '')
             code_text = code.get('code', '')
             self.codes_text.insert(tk.END, f"{i:3d}. [{timestamp}] {code_text}\n")
-        
+        self.rendered_count = len(self.scanned_codes)
+
         # Прокрутка вниз
         self.codes_text.see(tk.END)
 
@@ -370,6 +670,7 @@ class DataMatrixScanner:
     def clear_codes_list(self):
         """Очистить список кодов в окне"""
         self.scanned_codes.clear()
+        self.rendered_count = 0
         self.update_codes_display()
         self.reset_scan()
 
@@ -389,22 +690,54 @@ class DataMatrixScanner:
         sys.stdout.write("\a")
         sys.stdout.flush()
 
+    # ---------- трекинг рамок ----------
+    def track(self, code, poly, now):
+        """Запомнить рамку кода и время, когда он был виден"""
+        i = self.track_index.get(code)
+        if i is None:
+            self.track_index[code] = len(self.track_codes)
+            self.track_codes.append(code)
+            self.track_last_seen = np.append(self.track_last_seen, now)
+            self.track_polys = np.concatenate(
+                [self.track_polys, np.asarray(poly, np.int32)[None]]
+            )
+        else:
+            self.track_last_seen[i] = now
+            self.track_polys[i] = poly
+
+    def expire_tracked(self, now):
+        """Убрать рамки кодов, не появлявшихся дольше TRACK_TIMEOUT"""
+        keep = (now - self.track_last_seen) <= self.TRACK_TIMEOUT
+        if keep.all():
+            return
+        self.track_codes = [c for c, k in zip(self.track_codes, keep) if k]
+        self.track_index = {c: i for i, c in enumerate(self.track_codes)}
+        self.track_last_seen = self.track_last_seen[keep]
+        self.track_polys = self.track_polys[keep]
+
+    def clear_tracked(self):
+        self.track_codes = []
+        self.track_index = {}
+        self.track_last_seen = np.empty(0, np.float64)
+        self.track_polys = np.empty((0, 4, 2), np.int32)
+
     # ---------- очистка состояния ----------
     def reset_scan(self):
         self.seen_codes.clear()
-        self.tracked.clear()
+        self.clear_tracked()
+        self.active_rois = []
         self.code_counter = 0
         self.scan_start_time = None
         self.time_for_10_codes = None
         
-        # очистка очередей decode
+        # очистка слотов decode
         try:
-            while not self.decode_queue.empty():
-                self.decode_queue.get_nowait()
-            while not self.result_queue.empty():
-                self.result_queue.get_nowait()
-        except Empty:
+            self.decode_slot.pop()
+            # буфер из слота освободился, у worker'а остался прежний
+            self.gray_queued = self.gray_busy
+        except IndexError:
             pass
+        self.result_slot.clear()
 
         # Обновить отображение
         self.update_codes_display()
@@ -416,12 +749,16 @@ class DataMatrixScanner:
     # ---------- старт ----------
     def start(self):
         idx = self.selected_camera.get()
-        self.cap = cv2.VideoCapture(idx)
+        self.cap = open_camera(idx)
 
         if not self.cap.isOpened():
             messagebox.showerror("Ошибка", f"Не удалось открыть камеру {idx}")
             return
 
+        # буфер драйвера в 1 кадр — иначе в очереди копятся устаревшие кадры
+        if not self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1):
+            print(f"CAP_PROP_BUFFERSIZE не поддерживается ({self.cap.getBackendName()})")
+
         # Применение настроек камеры
         self.cap.set(cv2.CAP_PROP_FOURCC, self.camera_settings['fourcc'])
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.camera_settings['width'])
@@ -431,10 +768,15 @@ class DataMatrixScanner:
         import threading
         self.running = True
         self.logged_params = False
+        self.stats_t0 = None
+        self.stats_frames = 0
+        self.decode_times.clear()  # выборки прошлого запуска исказили бы p50/p95
+        self.roi_aspects = roi_aspects(self.camera_settings['dm_shape'])
+        self.frame_wanted.set()
 
         # Запуск потока захвата кадров
         self.capture_thread = threading.Thread(
-            target=self.capture_loop,
+            target=self.grab_loop,
             daemon=True
         )
         self.capture_thread.start()
@@ -442,99 +784,470 @@ class DataMatrixScanner:
         # Обновить статус
         self.status_label.config(text="Сканирование запущено", foreground="green")
         
-        # Скрыть основное окно и запустить цикл через after
+        # Скрыть основное окно; loop() запустится с первым кадром
         self.root.withdraw()
-        self.root.after(0, self.loop)
+        self.video_window.deiconify()
+        self.video_window.focus_force()
 
-    def capture_loop(self):
+    def grab_loop(self):
+        grabbed = 0
         while self.running and self.cap:
-            ret, frame = self.cap.read()
+            # grab() только продвигает поток, JPEG -> BGR делает retrieve()
+            if not self.cap.grab():
+                continue
+            grabbed += 1
+
+            # декодируем кадр, только когда loop() его ждёт;
+            # пока worker занят — лишь каждый N-й, для отрисовки
+            if not self.frame_wanted.is_set():
+                continue
+            if self.decode_slot and grabbed % self.RENDER_EVERY:
+                continue
+
+            back = self.front ^ 1
+            ret, frame = self.cap.retrieve(self.frame_bufs[back])
             if not ret:
                 continue
 
-            with self.frame_lock:
-                self.latest_frame = frame
+            self.frame_wanted.clear()
+            self.frame_bufs[back] = frame
+            self.front = back
+            self.frame_seq += 1
+            # присваивание ссылки атомарно под GIL — loop() не увидит
+            # номер одного кадра вместе с буфером другого
+            self.front_frame = (self.frame_seq, frame)
+            # when="tail" — событие встаёт в очередь Tk, поток не ждёт обработчик
+            try:
+                self.root.event_generate(self.FRAME_EVENT, when="tail")
+            except (RuntimeError, tk.TclError):
+                break  # главный цикл Tk уже завершён
 
     # ---------- ROI поиск ----------
-    def find_rois(self, gray):
-        edges = cv2.Canny(gray, 80, 160)
-        dilated = cv2.dilate(edges, np.ones((3, 3)), iterations=1)
+    def init_gpu(self):
+        """Подготовить CUDA-фильтры и буферы; None — если CUDA недоступна"""
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                return None
+            mean_filter = cv2.cuda.createGaussianFilter(
+                cv2.CV_8UC1, cv2.CV_8UC1, (25, 25), 0, 0,
+                cv2.BORDER_REPLICATE, cv2.BORDER_REPLICATE
+            )
+        except (AttributeError, cv2.error):
+            return None
+
+        return {
+            'mean_filter': mean_filter,
+            'src': cv2.cuda_GpuMat(),
+            'mean': cv2.cuda_GpuMat(),
+            'offset': None,  # константа C=5, создаётся под размер кадра
+            'shifted': cv2.cuda_GpuMat(),
+            'bw': cv2.cuda_GpuMat(),
+        }
 
-        contours, _ = cv2.findContours(
-            dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
+    def init_ocl(self):
+        """Включить OpenCL для cv2.UMat; False — если это не встроенная видеокарта"""
+        try:
+            if not cv2.ocl.haveOpenCL():
+                return False
+            cv2.ocl.setUseOpenCL(True)
+            dev = cv2.ocl.Device.getDefault()
+            # выигрыш только у iGPU с общей с CPU памятью: CPU-рантайм (pocl)
+            # лишь добавит копирования, дискретной карте кадр идёт по PCIe
+            if (cv2.ocl.useOpenCL() and dev.type() & cv2.ocl.Device_TYPE_GPU
+                    and dev.hostUnifiedMemory()):
+                return True
+            cv2.ocl.setUseOpenCL(False)
+            return False
+        except (AttributeError, cv2.error):
+            return False
+
+    def roi_workspace(self, shape):
+        """Буферы поиска ROI под кадр shape, переиспользуемые между кадрами"""
+        if self.roi_ws is None or self.roi_ws['shape'] != shape:
+            # целый коэффициент — координаты ROI переводятся без округлений
+            s = max(1, round(shape[1] / self.DETECT_WIDTH))
+            small_shape = (shape[0] // s, shape[1] // s)
+            self.roi_ws = {
+                'shape': shape,
+                'scale': s,
+                'small': np.empty(small_shape, np.uint8),
+                'bw': np.empty(small_shape, np.uint8),
+                'labels': np.empty(small_shape, np.int32),
+            }
+        return self.roi_ws
+
+    def binarize(self, gray, dst):
+        """adaptiveThreshold(GAUSSIAN, BINARY_INV, 25, 5) — на GPU, если есть"""
+        if isinstance(gray, cv2.UMat):
+            # OpenCL: считаем на устройстве, на CPU забираем только бинарную карту
+            return cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY_INV, 25, 5
+            ).get()
+        if self.gpu is None:
+            return cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                cv2.THRESH_BINARY_INV, 25, 5, dst=dst
+            )
 
+        g = self.gpu
+        g['src'].upload(gray)
         h, w = gray.shape
-        rois = []
+        if g['offset'] is None or g['offset'].size() != (w, h):
+            g['offset'] = cv2.cuda_GpuMat(h, w, cv2.CV_8UC1, (5,))
 
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            if area < 2000:
-                continue
+        # src - mean <= -C  <=>  src + C <= mean
+        g['mean'] = g['mean_filter'].apply(g['src'], g['mean'])
+        g['shifted'] = cv2.cuda.add(g['src'], g['offset'], g['shifted'])
+        g['bw'] = cv2.cuda.compare(g['shifted'], g['mean'], cv2.CMP_LE, g['bw'])
+        # по PCIe обратно идёт только бинарная карта
+        return g['bw'].download(dst)
 
-            x, y, cw, ch = cv2.boundingRect(cnt)
+    def find_rois(self, gray):
+        """Найти кандидатов в коды; координаты — в пикселях полного кадра"""
+        # для локализации полное разрешение не нужно — ищем на уменьшенной копии
+        ws = self.roi_workspace(gray.shape)
+        s = ws['scale']
+        size = (gray.shape[1] // s, gray.shape[0] // s)
+        if self.ocl:
+            # уменьшение 4K-кадра упирается в память CPU — отдаём его iGPU
+            small = cv2.resize(cv2.UMat(gray), size, interpolation=cv2.INTER_AREA)
+        else:
+            small = cv2.resize(gray, size, dst=ws['small'], interpolation=cv2.INTER_AREA)
 
-            if cw < 40 or ch < 40:
-                continue
-            if cw > w * 0.9 or ch > h * 0.9:
-                continue
+        # тёмные модули кода -> белые пиксели, кластеры модулей -> компоненты
+        bw = self.binarize(small, ws['bw'])
+        _, _, stats, _ = cv2.connectedComponentsWithStats(
+            bw, labels=ws['labels'], connectivity=8
+        )
+
+        h, w = bw.shape
+        # площадь компоненты — только тёмные пиксели (~половина кода)
+        if len(self.stats_out) < len(stats):
+            self.stats_out = np.empty((len(stats), 4), np.int32)
+        out = self.stats_out
+        n = filter_stats(stats, w, h, 1000 / (s * s), 40 / s, self.roi_aspects,
+                         MIN_FILL, FILL_MAX_SIDE, out)
+
+        return [(int(x) * s, int(y) * s, int(cw) * s, int(ch) * s) for x, y, cw, ch in out[:n]]
+
+    def expand_roi(self, roi, shape):
+        """Расширить ROI на ROI_PAD пикселей с каждой стороны в пределах кадра"""
+        x, y, w, h = roi
+        pad = self.ROI_PAD
+        x0, y0 = max(x - pad, 0), max(y - pad, 0)
+        x1, y1 = min(x + w + pad, shape[1]), min(y + h + pad, shape[0])
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def hit_box(self, res, ox, oy, image_h):
+        """Рамка (x, y, w, h) кода в кадре по rect результата pylibdmtx.
+
+        rect задаёт диагональ символа (углы p00 -> p11) в координатах
+        изображения высотой image_h с началом в левом нижнем углу;
+        (ox, oy) — положение этого изображения в кадре. Квадрат со стороной
+        в длину диагонали вмещает символ при любом повороте.
+        """
+        left, bottom, width, height = res.rect
+        side = int(np.hypot(width, height)) + 1
+        cx = ox + left + width / 2
+        cy = oy + image_h - (bottom + height / 2)
+        return (max(int(cx - side / 2), 0), max(int(cy - side / 2), 0), side, side)
+
+    def overlaps(self, a, b):
+        """Пересекаются ли прямоугольники (x, y, w, h)"""
+        return (a[0] < b[0] + b[2] and b[0] < a[0] + a[2]
+                and a[1] < b[1] + b[3] and b[1] < a[1] + a[3])
+
+    # ---------- пакетный декод ROI ----------
+    def pack_rois(self, gray, rois, slot=0):
+        """Разложить ROI по полкам на белом холсте.
+
+        Холст — срез буфера canvas_bufs[slot]. Возвращает холст и для каждого
+        ROI (cx, cy, w, h) — позицию на холсте и фактический размер вырезки.
+        """
+        gap = self.CANVAS_GAP
+        crops = [gray[y:y+h, x:x+w] for (x, y, w, h) in rois]
+
+        area = sum((c.shape[1] + gap) * (c.shape[0] + gap) for c in crops)
+        width = max(max(c.shape[1] for c in crops) + 2 * gap, int(area ** 0.5))
+
+        # высокие ROI первыми — полки получаются плотнее
+        order = sorted(range(len(crops)), key=lambda i: crops[i].shape[0], reverse=True)
+        places = [None] * len(crops)
+        cx, cy, shelf_h = gap, gap, 0
+        for i in order:
+            ch, cw = crops[i].shape
+            if cx + cw + gap > width:
+                cx, cy, shelf_h = gap, cy + shelf_h + gap, 0
+            places[i] = (cx, cy, cw, ch)
+            cx += cw + gap
+            shelf_h = max(shelf_h, ch)
+
+        H = cy + shelf_h + gap
+        buf = self.canvas_bufs.get(slot)
+        if buf is None or buf.shape[0] < H or buf.shape[1] < width:
+            shape = (H, width) if buf is None else (max(H, buf.shape[0]), max(width, buf.shape[1]))
+            buf = self.canvas_bufs[slot] = np.empty(shape, np.uint8)
+        # pylibdmtx всё равно копирует изображение (tobytes), срез ему подходит
+        canvas = buf[:H, :width]
+        canvas.fill(255)
+        for crop, (cx, cy, cw, ch) in zip(crops, places):
+            canvas[cy:cy+ch, cx:cx+cw] = crop
+
+        return canvas, places
+
+    def decode_rois(self, gray, rois):
+        """Декодировать ROI: по холсту на поток, холсты — параллельно.
+
+        Возвращает [(result, индекс ROI)]; rect результата — такой же, как
+        при декодировании этого ROI по отдельности.
+        """
+        if not rois:
+            return []
+
+        # делим ROI между потоками поровну по площади
+        groups = [[] for _ in range(min(self.DECODE_WORKERS, len(rois)))]
+        load = [0] * len(groups)
+        for i in sorted(range(len(rois)), key=lambda i: rois[i][2] * rois[i][3], reverse=True):
+            g = load.index(min(load))
+            groups[g].append(i)
+            load[g] += rois[i][2] * rois[i][3]
+
+        futures = {}
+        for slot, group in enumerate(groups):
+            canvas, places = self.pack_rois(gray, [rois[i] for i in group], slot)
+            future = self.decode_pool.submit(
+                pylibdmtx.decode, canvas, timeout=self.CANVAS_TIMEOUT, shrink=1,
+                shape=self.camera_settings['dm_shape'],
+                max_count=self.ROI_MAX_COUNT * len(group)
+            )
+            futures[future] = (group, places, canvas.shape[0])
 
-            rois.append((x, y, cw, ch))
+        # ждём все задачи: ни одна не должна пережить проход и читать
+        # холст или кадр, когда их уже перезаписывают
+        wait(futures)
+        hits = []
+        for future, (group, places, H) in futures.items():
+            try:
+                decoded = future.result()
+            except Exception:
+                continue  # сбой одного холста не отменяет остальные
+            for r in decoded:
+                left, top, width, height = r.rect
+                # у libdmtx начало координат — левый нижний угол изображения
+                px = left + width / 2
+                py = H - (top + height / 2)
+                for j, (cx, cy, cw, ch) in enumerate(places):
+                    if cx <= px < cx + cw and cy <= py < cy + ch:
+                        rect = r.rect._replace(left=left - cx, top=top - (H - cy - ch))
+                        hits.append((r._replace(rect=rect), group[j]))
+                        break
+
+        return hits
+
+    def frame_tiles(self, shape):
+        """Сетка TILE_GRID x TILE_GRID плиток с перекрытием TILE_OVERLAP, считается один раз"""
+        if self.tiles_shape != shape:
+            n, ov = self.TILE_GRID, self.TILE_OVERLAP
+            H, W = shape
+            # n плиток с перекрытием ov ровно покрывают кадр
+            tw = int(np.ceil(W / (n - (n - 1) * ov)))
+            th = int(np.ceil(H / (n - (n - 1) * ov)))
+            xs = [min(i * int(tw * (1 - ov)), W - tw) for i in range(n)]
+            ys = [min(i * int(th * (1 - ov)), H - th) for i in range(n)]
+            self.tiles = [(x, y, tw, th) for y in ys for x in xs]
+            self.tiles_shape = shape
+        return self.tiles
+
+    def decode_tiles(self, gray):
+        """Декодировать весь кадр по плиткам параллельно; [(result, (x, y) плитки)]"""
+        futures = {}
+        for x, y, tw, th in self.frame_tiles(gray.shape):
+            # срез без копии: pylibdmtx сам копирует изображение (tobytes)
+            future = self.decode_pool.submit(
+                pylibdmtx.decode, gray[y:y+th, x:x+tw], timeout=10,
+                shrink=self.FALLBACK_SHRINK, shape=self.camera_settings['dm_shape'],
+                max_count=self.FALLBACK_MAX_COUNT
+            )
+            futures[future] = (x, y)
 
-        return rois
+        # код в зоне перекрытия находят две-четыре плитки — оставляем первую
+        wait(futures)  # см. decode_rois: плитки — срезы кадра без копии
+        seen, results = set(), []
+        for future, offset in futures.items():
+            try:
+                decoded = future.result()
+            except Exception:
+                continue
+            for r in decoded:
+                if r.data not in seen:
+                    seen.add(r.data)
+                    results.append((r, offset))
+        return results
 
     # ---------- worker декодирования ----------
     def decode_worker(self):
         while True:
             try:
-                gray = self.decode_queue.get()
+                self.decode_ready.wait()
+                self.decode_ready.clear()
+                try:
+                    gray = self.decode_slot.popleft()
+                except IndexError:
+                    continue
+
+                # --- сцена не изменилась и кодов в ней нет — декодировать нечего ---
+                cur = cv2.pyrDown(cv2.pyrDown(gray))
+                prev, self.prev_small = self.prev_small, cur
+                if (prev is not None and prev.shape == cur.shape
+                        and not self.active_rois
+                        and self.idle_skips < self.IDLE_DECODE_EVERY
+                        and int(cv2.absdiff(cur, prev).max()) < self.MOTION_THRESHOLD):
+                    self.idle_skips += 1
+                    continue
+                self.idle_skips = 0
+
+                t0 = time.perf_counter()
                 results = []
+                self.decode_passes += 1
+                periodic = self.decode_passes % self.FALLBACK_EVERY == 0
+
+                # --- сначала окрестности недавно найденных кодов ---
+                now = time.time()
+                active = [r[:4] for r in self.active_rois if r[4] > now]
+                rois = [self.expand_roi(r, gray.shape) for r in active]
+                hits = self.decode_rois(gray, rois)
+
+                if not hits:
+                    # --- промах: ищем ROI по всему кадру ---
+                    active = rois = self.find_rois(gray)
+                    hits = self.decode_rois(gray, rois)
+                elif periodic:
+                    # --- трекинг идёт, но в кадр мог войти новый код: раз в
+                    # FALLBACK_EVERY проходов ищем ROI по всему кадру, уже
+                    # отслеживаемые окрестности повторно не декодируем ---
+                    fresh = [c for c in self.find_rois(gray)
+                             if not any(self.overlaps(c, r) for r in rois)]
+                    base = len(rois)
+                    hits += [(r, base + i) for r, i in self.decode_rois(gray, fresh)]
+                    active = active + fresh
+                    rois = rois + fresh
+
+                for r, i in hits:
+                    x, y, _, _ = rois[i]
+                    results.append((r, (x, y)))
+
+                # ROI с найденными кодами остаются активными ещё ROI_TIMEOUT
+                expires = time.time() + self.ROI_TIMEOUT
+                self.active_rois = [
+                    (*active[i], expires) for i in sorted({i for _, i in hits})
+                ]
 
-                rois = self.find_rois(gray)
-
-                # --- декод всех ROI ---
-                for (x, y, w, h) in rois:
-                    roi = gray[y:y+h, x:x+w]
-                    decoded = pylibdmtx.decode(roi, timeout=5)
-
-                    for r in decoded:
-                        results.append((r, (x, y)))
-
-                # --- fallback: раз в 10 кадров сканируем весь кадр ---
-                if len(results) < 2:
-                    decoded_full = pylibdmtx.decode(gray, timeout=10)
-                    for r in decoded_full:
-                        results.append((r, (0, 0)))
+                # --- fallback: раз в FALLBACK_EVERY проходов, если ROI ничего не дали,
+                # сканируем весь кадр; в такой проход find_rois всегда отработал ---
+                if periodic and not results:
+                    if gray.shape[1] >= self.TILE_MIN_WIDTH:
+                        # 4K одним вызовом — сотни мс; плитки идут на все потоки
+                        results = self.decode_tiles(gray)
+                        image_h = self.tiles[0][3]  # плитки одного размера
+                    else:
+                        decoded_full = pylibdmtx.decode(
+                            gray, timeout=10, shrink=self.FALLBACK_SHRINK,
+                            shape=self.camera_settings['dm_shape'],
+                            max_count=self.FALLBACK_MAX_COUNT
+                        )
+                        for r in decoded_full:
+                            results.append((r, (0, 0)))
+                        image_h = gray.shape[0]
+
+                    # найденные здесь коды дальше идут быстрым путём через ROI
+                    self.active_rois += [
+                        (*self.hit_box(r, ox, oy, image_h), expires)
+                        for r, (ox, oy) in results
+                    ]
+
+                dt = time.perf_counter() - t0
+                self.decode_times.append(dt)
+                self.decode_ema = 0.9 * self.decode_ema + 0.1 * dt
 
                 if results:
-                    self.result_queue.put(results)
+                    # несчитанные результаты устарели — append() их вытесняет
+                    self.result_slot.append(results)
             except Exception:
                 pass
 
+    # ---------- телеметрия ----------
+    def print_stats(self, now):
+        fps = self.stats_frames / (now - self.stats_t0)
+        line = (f"fps={fps:.1f} qd={len(self.decode_slot)} "
+                f"rq={len(self.result_slot)}")
+        times = list(self.decode_times)
+        if times:
+            p50, p95 = np.percentile(times, [50, 95])
+            line += f" decode_p50={p50 * 1000:.1f}ms decode_p95={p95 * 1000:.1f}ms"
+        line += f" decode_ema={self.decode_ema * 1000:.1f}ms"
+        print(line)
+
+        self.stats_t0 = now
+        self.stats_frames = 0
+
+    def submit_gray(self, frame):
+        """Перевести кадр в серый и передать worker'у (без копирования)"""
+        if self.gray_bufs is None or self.gray_bufs[0].shape != frame.shape[:2]:
+            self.gray_bufs = [np.empty(frame.shape[:2], np.uint8) for _ in range(3)]
+            self.gray_busy = self.gray_queued = None
+
+        # старый кадр всегда выбрасываем; если слот пуст — его забрал worker
+        try:
+            self.decode_slot.pop()
+        except IndexError:
+            self.gray_busy = self.gray_queued
+
+        idx = next(i for i in range(3) if i != self.gray_busy)
+        gray = cv2.transform(frame, self.gray_weights, dst=self.gray_bufs[idx])
+
+        self.decode_slot.append(gray)
+        self.gray_queued = idx
+        self.decode_ready.set()
+
     # ---------- основной цикл ----------
     def loop(self):
+        # запоздавшее событие после stop() — игнорируем
         if not self.running:
-            self.stop()
             return
 
-        # Получить последний кадр из потока
-        with self.frame_lock:
-            if self.latest_frame is None:
-                self.root.after(1, self.loop)
-                return
-            frame = self.latest_frame.copy()
+        # Получить последний кадр из потока (если он новый)
+        # копия не нужна: в этот буфер retrieve() не пишет, пока не выставлен frame_wanted
+        seq, frame = self.front_frame
+        if seq == self.shown_seq:
+            return
+        self.shown_seq = seq
 
         # ---- цифровой зум (мягкий) ----
         if self.zoom_factor > 1.0:
             h, w = frame.shape[:2]
-            cw = int(w / self.zoom_factor)
-            ch = int(h / self.zoom_factor)
-
-            x1 = (w - cw) // 2
-            y1 = (h - ch) // 2
-
-            frame = frame[y1:y1 + ch, x1:x1 + cw]
-            frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_LINEAR)
+            if self.zoom_key != (self.zoom_factor, frame.shape):
+                cw = int(w / self.zoom_factor)
+                ch = int(h / self.zoom_factor)
+
+                x1 = (w - cw) // 2
+                y1 = (h - ch) // 2
+
+                # то же, что resize(frame[y1:y1+ch, x1:x1+cw], (w, h)),
+                # включая привязку к центрам пикселей
+                sx, sy = w / cw, h / ch
+                self.zoom_matrix = np.array([
+                    [sx, 0, (0.5 - x1) * sx - 0.5],
+                    [0, sy, (0.5 - y1) * sy - 0.5],
+                ], dtype=np.float32)
+                self.zoom_buf = np.empty_like(frame)
+                self.zoom_key = (self.zoom_factor, frame.shape)
+
+            # один проход по пикселям вместо кропа + resize
+            frame = cv2.warpAffine(
+                frame, self.zoom_matrix, (w, h), dst=self.zoom_buf,
+                flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+            )
 
         if not self.logged_params and self.cap is not None:
             w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -543,24 +1256,25 @@ class DataMatrixScanner:
             print(f"Фактические параметры: {w}x{h} @ {fps} FPS")
             self.logged_params = True
 
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.convertScaleAbs(gray, alpha=0.40, beta=0)
         now = time.time()
 
         self.frame_counter += 1
-
-        # передаём КОПИЮ кадра, старый всегда выбрасываем
-        try:
-            while not self.decode_queue.empty():
-                self.decode_queue.get_nowait()
-            self.decode_queue.put_nowait(gray.copy())
-        except Empty:
-            pass
+        self.stats_frames += 1
+        if self.stats_t0 is None:
+            self.stats_t0 = now
+        elif now - self.stats_t0 >= self.STATS_INTERVAL:
+            self.print_stats(now)
+
+        # worker освободится не раньше чем через ~decode_ema — до этого кадр
+        # ему не нужен, не тратим время на перевод в серый
+        if now - self.last_submit >= self.decode_ema:
+            self.last_submit = now
+            self.submit_gray(frame)
 
         # обработка результатов из worker
         try:
-            results = self.result_queue.get_nowait()
-        except Empty:
+            results = self.result_slot.popleft()
+        except IndexError:
             results = []
 
         for res, (ox, oy) in results:
@@ -598,62 +1312,59 @@ class DataMatrixScanner:
                 print(f"{self.code_counter}. {code} [{timestamp}]")
                 self.beep()
                 
-                # Обновить отображение
-                self.update_codes_display()
+                # Обновить отображение: несколько кодов за кадр — одна перерисовка
+                self.schedule_codes_display()
                 self.update_time_display()
 
-            self.tracked[code] = {
-                "polygon": poly,
-                "last_seen": now
-            }
+            self.track(code, poly, now)
 
         # --- очистка ушедших ---
-        expired = [
-            c for c, d in self.tracked.items()
-            if now - d["last_seen"] > self.TRACK_TIMEOUT
-        ]
-        for c in expired:
-            del self.tracked[c]
-
-        # --- отрисовка ---
-        for d in self.tracked.values():
-            pts = d["polygon"]
-            for i in range(len(pts)):
-                cv2.line(
-                    frame, pts[i], pts[(i+1) % len(pts)],
-                    (0, 255, 0), 2
-                )
-        
+        self.expire_tracked(now)
+
+        # 4K на экран всё равно не помещается — показываем уменьшенную копию
+        h, w = frame.shape[:2]
+        if w > self.DISPLAY_WIDTH:
+            size = (self.DISPLAY_WIDTH, h * self.DISPLAY_WIDTH // w)
+            if self.display_buf is None or self.display_buf.shape[1::-1] != size:
+                self.display_buf = np.empty((size[1], size[0], 3), np.uint8)
+            view = cv2.resize(frame, size, dst=self.display_buf, interpolation=cv2.INTER_AREA)
+        else:
+            view = frame
+
+        # --- отрисовка (все рамки одним вызовом, уже в масштабе окна) ---
+        if self.track_codes:
+            polys = self.track_polys
+            if view is not frame:
+                polys = (polys * (view.shape[1] / w)).astype(np.int32)
+            cv2.polylines(view, list(polys), isClosed=True, color=(0, 255, 0), thickness=2)
+
         # Понизить яркость отображаемого кадра
-        frame = cv2.convertScaleAbs(frame, alpha=0.8, beta=0)
+        cv2.convertScaleAbs(view, dst=view, alpha=0.8, beta=0)
 
         # Добавить информацию на кадр
-        cv2.putText(frame, f"Codes: {self.code_counter}", (10, 30),
+        cv2.putText(view, f"Codes: {self.code_counter}", (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
         
         if self.time_for_10_codes:
             time_text = f"Time for 10: {self.time_for_10_codes:.2f}s"
-            cv2.putText(frame, time_text, (10, 70),
+            cv2.putText(view, time_text, (10, 70),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
 
-        cv2.imshow("DataMatrix Scanner (Q — выход, C — очистка)", frame)
-
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord("q"):
-            self.running = False
-            self.stop()
-            return
-        elif key == ord("c"):
-            self.reset_scan()
+        # PPM (P6) Tk читает сам, BGR -> RGB делает imencode — без PIL
+        ok, ppm = cv2.imencode(".ppm", view)
+        if ok:
+            self.video_photo.configure(data=ppm.tobytes(), format="PPM")
 
-        self.root.after(1, self.loop)
+        # кадр больше не нужен — можно декодировать следующий;
+        # loop() снова вызовет событие FRAME_EVENT из grab_loop
+        self.frame_wanted.set()
 
     # ---------- стоп ----------
     def stop(self):
         self.running = False
         if self.cap:
             self.cap.release()
-        cv2.destroyAllWindows()
+        self.video_window.withdraw()
         self.root.deiconify()
         self.status_label.config(text="Сканирование остановлено", foreground="red")
 